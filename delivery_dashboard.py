@@ -1,406 +1,568 @@
-"""
-delivery_dashboard.py
-~~~~~~~~~~~~~~~~~~~~~
-Interactive dashboard for Daily / Weekly / Monthly / Quarterly / Half-Yearly
-delivery percentage with optional Close‑price overlay.
-
-Author  : Yash Goyal
-Last Mod: 2025‑07‑21 (updated with date range avg delivery %)
-"""
-
-from io import StringIO
-import pandas as pd
-import altair as alt
-import streamlit as st
-
-# ------------------------------------------------------------------#
-# 1. Page config
-# ------------------------------------------------------------------#
-st.set_page_config(page_title="Delivery % Dashboard", layout="wide")
-st.title("📊 Delivery Percentage Dashboard")
-
-# ------------------------------------------------------------------#
-# 📚 Table of Contents (Sidebar Links)
-# ------------------------------------------------------------------#
-st.sidebar.markdown("## 📚 Table of Contents")
-st.sidebar.markdown("[1. Summary Metrics](#summary-metrics)")
-st.sidebar.markdown("[2. Daily Delivery % Table](#daily-delivery-table)")
-st.sidebar.markdown("[3. Weekly Delivery % Table](#weekly-delivery-table)")
-st.sidebar.markdown("[4. Monthly Delivery % Table](#monthly-delivery-table)")
-st.sidebar.markdown("[5. Quarterly Delivery % Table](#quarterly-delivery-table)")
-st.sidebar.markdown("[6. Half-Yearly Delivery % Table](#half-yearly-delivery-table)")
-st.sidebar.markdown("[7. Yearly Delivery % Table](#yearly-delivery-table)")
-
-
-# ------------------------------------------------------------------#
-# 2. File upload (support multiple CSVs)
-# ------------------------------------------------------------------#
-uploaded_files = st.sidebar.file_uploader(
-    "📌 Upload one or more CSV files", type=["csv"], accept_multiple_files=True
-)
-if not uploaded_files:
-    st.info("Upload at least one CSV to begin.")
-    st.stop()
-
-# ------------------------------------------------------------------#
-# 3. Data loader & cleaner
-# ------------------------------------------------------------------#
-@st.cache_data(show_spinner=False)
-def load_and_clean(raw_csv: str) -> pd.DataFrame:
-    df = pd.read_csv(StringIO(raw_csv))
-    df.columns = [c.strip().lower().replace(" ", "_") for c in df.columns]
-
-    COL_MAP = {
-        "symbol": "symbol",
-        "date": "date",
-        "qty_traded": "traded_qty",
-        "total_traded_quantity": "traded_qty",
-        "traded_qty": "traded_qty",
-        "deliverable_qty": "deliverable_qty",
-        "delivered_qty": "deliverable_qty",
-        "delivery_percentage": "delivery_pct",
-        "delivery_percent": "delivery_pct",
-        "%_dly_qt_to_traded_qty": "delivery_pct",
-        "delivery_pct": "delivery_pct",
-        "open_price": "open",
-        "open": "open",
-        "closeprice": "close",
-        "close_price": "close",
-        "closing_price": "close",
-        "close": "close",
-    }
-    df.rename(columns=lambda c: COL_MAP.get(c, c), inplace=True)
-
-    REQUIRED = ["symbol", "date", "traded_qty", "deliverable_qty", "delivery_pct"]
-    missing = [c for c in REQUIRED if c not in df.columns]
-    if missing:
-        raise ValueError(f"Missing column(s): {', '.join(missing)}")
-
-    df.replace(["-", "NA", "N/A", "na", ""], pd.NA, inplace=True)
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df.dropna(subset=["date"], inplace=True)
-
-    numeric_cols = ["traded_qty", "deliverable_qty", "delivery_pct"]
-    if "open" in df.columns:
-        numeric_cols.append("open")
-    if "close" in df.columns:
-        numeric_cols.append("close")
-
-    for c in numeric_cols:
-        df[c] = (
-            df[c]
-            .astype(str)
-            .str.replace(",", "", regex=False)
-            .str.replace("%", "", regex=False)
-            .replace("", pd.NA)
-        )
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-
-    df.dropna(subset=["traded_qty", "deliverable_qty", "delivery_pct"], inplace=True)
-    df["traded_qty"] = df["traded_qty"].astype(int)
-    df["deliverable_qty"] = df["deliverable_qty"].astype(int)
-
-    # ✅ Calculate Net Value = Deliverable Qty × Open Price
-    df["net_value"] = pd.NA
-    if "open" in df.columns:
-        df["net_value"] = df["deliverable_qty"] * df["open"]
-
-    return df.reset_index(drop=True)
-
-# ------------------------------------------------------------------#
-# 4. Load, clean and merge multiple files
-# ------------------------------------------------------------------#
-dfs = []
-for up in uploaded_files:
-    part = load_and_clean(up.read().decode("utf-8", errors="ignore"))
-    dfs.append(part)
-
-df = (
-    pd.concat(dfs, ignore_index=True)
-    .drop_duplicates(subset=["symbol", "date"])
-    .sort_values("date")
-    .reset_index(drop=True)
-)
-
-# ------------------------------------------------------------------#
-# New: Date range selector for filtered average delivery %
-# ------------------------------------------------------------------#
-min_date = df["date"].min()
-max_date = df["date"].max()
-
-date_range = st.sidebar.date_input(
-    "📅 Select Date Range for Avg Delivery %",
-    value=(min_date, max_date),
-    min_value=min_date,
-    max_value=max_date,
-)
-
-if isinstance(date_range, tuple) and len(date_range) == 2:
-    start_date, end_date = date_range
-else:
-    start_date, end_date = min_date, max_date
-
-df_filtered = df[(df["date"] >= pd.to_datetime(start_date)) & (df["date"] <= pd.to_datetime(end_date))]
-avg_delivery_filtered = df_filtered["delivery_pct"].mean() if not df_filtered.empty else float('nan')
-
-# ------------------------------------------------------------------#
-# 5. Sidebar filters
-# ------------------------------------------------------------------#
-spike_thr = st.sidebar.slider("🚨 Spike threshold (%)", 0.0, 100.0, 75.0, step=0.5)
-net_value_thr = st.sidebar.slider("💰 Net Value Spike (₹ Cr)", 0.0, 50.0, 3.0, step=0.5)
-
-# ------------------------------------------------------------------#
-# 6. Summary metrics
-# ------------------------------------------------------------------#
-st.markdown('<a name="summary-metrics"></a>', unsafe_allow_html=True)
-st.subheader("📌 Summary Metrics")
-col1, col2, col3, col4 = st.columns(4)
-
-col1.metric("Average Delivery % (Overall)", f"{df['delivery_pct'].mean():.2f}")
-col2.metric(
-    f"Average Delivery % ({start_date} to {end_date})",
-    f"{avg_delivery_filtered:.2f}" if not pd.isna(avg_delivery_filtered) else "N/A"
-)
-col3.metric("Max Delivery %", f"{df['delivery_pct'].max():.2f}")
-col4.metric("Total Days", int(df["date"].nunique()))
-
-# ------------------------------------------------------------------#
-# 7. Spike alerts
-# ------------------------------------------------------------------#
-spikes = df[df["delivery_pct"] >= spike_thr]
-if not spikes.empty:
-    st.warning(f"🚨 {len(spikes)} spike(s) ≥ {spike_thr}%")
-    st.dataframe(spikes[["date", "symbol", "delivery_pct"]])
-
-# ------------------------------------------------------------------#
-# 8. Daily Delivery % Table
-# ------------------------------------------------------------------#
-st.markdown('<a name="daily-delivery-table"></a>', unsafe_allow_html=True)
-st.subheader("📆 Daily Delivery % (Quantities in Millions, Net Value in ₹ Crores)")
-
-df = df.sort_values(["symbol", "date"])
-df["traded_qty_chg_%"] = df.groupby("symbol")["traded_qty"].pct_change() * 100
-df["deliverable_qty_chg_%"] = df.groupby("symbol")["deliverable_qty"].pct_change() * 100
-
-daily_disp = df.copy()
-daily_disp["traded_qty_mn"] = (daily_disp["traded_qty"] / 1e6).round(2)
-daily_disp["deliverable_qty_mn"] = (daily_disp["deliverable_qty"] / 1e6).round(2)
-daily_disp["net_value_crore"] = (daily_disp["net_value"] / 1e7).round(2)
-daily_disp["traded_qty_chg_%"] = daily_disp["traded_qty_chg_%"].round(2)
-daily_disp["deliverable_qty_chg_%"] = daily_disp["deliverable_qty_chg_%"].round(2)
-
-daily_columns = [
-    "date",
-    "symbol",
-    "traded_qty_mn",
-    "deliverable_qty_mn",
-    "delivery_pct",
-    "net_value_crore",
-    "traded_qty_chg_%",
-    "deliverable_qty_chg_%",
-]
-
-def highlight_net_value(val):
-    if pd.notna(val) and val > net_value_thr:
-        return "background-color: #ffe6e6; font-weight: bold"
-    return ""
-
-styled_df = daily_disp[daily_columns].style.applymap(
-    highlight_net_value, subset=["net_value_crore"]
-)
-
-st.dataframe(styled_df, use_container_width=True)
-
-# ------------------------------------------------------------------#
-# 9. Weekly Aggregation
-# ------------------------------------------------------------------#
-st.markdown('<a name="weekly-delivery-table"></a>', unsafe_allow_html=True)
-st.subheader("📅 Weekly Delivery % (Quantities in Millions, Net Value in ₹ Crores)")
-
-df["week"] = df["date"].dt.to_period("W").apply(lambda r: r.start_time)
-weekly = (
-    df.groupby(["week", "symbol"], as_index=False)[["traded_qty", "deliverable_qty", "net_value"]]
-    .sum()
-)
-weekly["delivery_pct"] = 100 * weekly["deliverable_qty"] / weekly["traded_qty"]
-weekly = weekly.sort_values(["symbol", "week"])
-weekly["traded_qty_chg_%"] = weekly.groupby("symbol")["traded_qty"].pct_change() * 100
-weekly["deliverable_qty_chg_%"] = weekly.groupby("symbol")["deliverable_qty"].pct_change() * 100
-
-weekly_disp = weekly.copy()
-weekly_disp["traded_qty_million"] = (weekly_disp["traded_qty"] / 1e6).round(2)
-weekly_disp["deliverable_qty_million"] = (weekly_disp["deliverable_qty"] / 1e6).round(2)
-weekly_disp["net_value_crore"] = (weekly_disp["net_value"] / 1e7).round(2)
-weekly_disp["traded_qty_chg_%"] = weekly_disp["traded_qty_chg_%"].round(2)
-weekly_disp["deliverable_qty_chg_%"] = weekly_disp["deliverable_qty_chg_%"].round(2)
-weekly_disp = weekly_disp[
-    ["week", "symbol", "traded_qty_million", "deliverable_qty_million", "delivery_pct",
-     "net_value_crore", "traded_qty_chg_%", "deliverable_qty_chg_%"]
-]
-styled_weekly = weekly_disp.style.applymap(highlight_net_value, subset=["net_value_crore"])
-st.dataframe(styled_weekly, use_container_width=True)
-
-wk_chart = (
-    alt.Chart(weekly)
-    .mark_line(point=True)
-    .encode(x="week:T", y="delivery_pct:Q", color="symbol:N",
-            tooltip=["week:T", "symbol:N", "delivery_pct:Q"])
-    .properties(width=900, height=400, title="Weekly Delivery %")
-)
-st.altair_chart(wk_chart, use_container_width=True)
-
-
-# ------------------------------------------------------------------#
-# 10. Monthly Aggregation (Millions)
-# ------------------------------------------------------------------#
-
-st.markdown('<a name="monthly-delivery-table"></a>', unsafe_allow_html=True)
-st.subheader("📅 Monthly Delivery % (Quantities in Millions, Net Value in ₹ Crores)")
-
-
-df["month"] = df["date"].dt.to_period("M").apply(lambda r: r.start_time)
-monthly = (
-    df.groupby(["month", "symbol"], as_index=False)[["traded_qty", "deliverable_qty", "net_value"]]
-    .sum()
-)
-monthly["delivery_pct"] = 100 * monthly["deliverable_qty"] / monthly["traded_qty"]
-monthly = monthly.sort_values(["symbol", "month"])
-monthly["traded_qty_chg_%"] = monthly.groupby("symbol")["traded_qty"].pct_change() * 100
-monthly["deliverable_qty_chg_%"] = monthly.groupby("symbol")["deliverable_qty"].pct_change() * 100
-
-monthly_disp = monthly.copy()
-monthly_disp["traded_qty_million"] = (monthly_disp["traded_qty"] / 1e6).round(2)
-monthly_disp["deliverable_qty_million"] = (monthly_disp["deliverable_qty"] / 1e6).round(2)
-monthly_disp["net_value_crore"] = (monthly_disp["net_value"] / 1e7).round(2)
-monthly_disp["traded_qty_chg_%"] = monthly_disp["traded_qty_chg_%"].round(2)
-monthly_disp["deliverable_qty_chg_%"] = monthly_disp["deliverable_qty_chg_%"].round(2)
-monthly_disp = monthly_disp[
-    ["month", "symbol", "traded_qty_million", "deliverable_qty_million", "delivery_pct",
-     "net_value_crore", "traded_qty_chg_%", "deliverable_qty_chg_%"]
-]
-styled_monthly = monthly_disp.style.applymap(highlight_net_value, subset=["net_value_crore"])
-st.dataframe(styled_monthly, use_container_width=True)
-
-mo_chart = (
-    alt.Chart(monthly)
-    .mark_line(point=True)
-    .encode(x="month:T", y="delivery_pct:Q", color="symbol:N",
-            tooltip=["month:T", "symbol:N", "delivery_pct:Q"])
-    .properties(width=900, height=400, title="Monthly Delivery %")
-)
-st.altair_chart(mo_chart, use_container_width=True)
-
-# ------------------------------------------------------------------#
-# 11. Quarterly Aggregation (Millions)
-# ------------------------------------------------------------------#
-st.markdown('<a name="quarterly-delivery-table"></a>', unsafe_allow_html=True)
-st.subheader("📊 Quarterly Delivery % (Quantities in Millions, Net Value in ₹ Crores)")
-
-df["quarter"] = df["date"].dt.to_period("Q").apply(lambda r: r.start_time)
-quarterly = (
-    df.groupby(["quarter", "symbol"], as_index=False)[["traded_qty", "deliverable_qty", "net_value"]]
-    .sum()
-)
-quarterly["delivery_pct"] = 100 * quarterly["deliverable_qty"] / quarterly["traded_qty"]
-
-quarterly_disp = quarterly.copy()
-quarterly_disp["traded_qty_million"] = (quarterly_disp["traded_qty"] / 1e6).round(2)
-quarterly_disp["deliverable_qty_million"] = (quarterly_disp["deliverable_qty"] / 1e6).round(2)
-quarterly_disp["net_value_crore"] = (quarterly_disp["net_value"] / 1e7).round(2)
-quarterly_disp = quarterly_disp[
-    ["quarter", "symbol", "traded_qty_million", "deliverable_qty_million", "delivery_pct", "net_value_crore"]
-]
-styled_quarterly = quarterly_disp.style.applymap(highlight_net_value, subset=["net_value_crore"])
-st.dataframe(styled_quarterly, use_container_width=True)
-
-qt_chart = (
-    alt.Chart(quarterly)
-    .mark_line(point=True)
-    .encode(x="quarter:T", y="delivery_pct:Q", color="symbol:N",
-            tooltip=["quarter:T", "symbol:N", "delivery_pct:Q"])
-    .properties(width=900, height=400, title="Quarterly Delivery %")
-)
-st.altair_chart(qt_chart, use_container_width=True)
-
-# ------------------------------------------------------------------#
-# 12. Half-Yearly Aggregation (Millions)
-# ------------------------------------------------------------------#
-st.markdown('<a name="half-yearly-delivery-table"></a>', unsafe_allow_html=True)
-st.subheader("📈 Half-Yearly Delivery % (Quantities in Millions, Net Value in ₹ Crores)")
-
-def get_half_year(d):
-    year = d.year
-    return pd.Timestamp(f"{year}-01-01") if d.month <= 6 else pd.Timestamp(f"{year}-07-01")
-
-df["half_year"] = df["date"].apply(get_half_year)
-half_yearly = (
-    df.groupby(["half_year", "symbol"], as_index=False)[["traded_qty", "deliverable_qty", "net_value"]]
-    .sum()
-)
-half_yearly["delivery_pct"] = 100 * half_yearly["deliverable_qty"] / half_yearly["traded_qty"]
-
-half_disp = half_yearly.copy()
-half_disp["traded_qty_million"] = (half_disp["traded_qty"] / 1e6).round(2)
-half_disp["deliverable_qty_million"] = (half_disp["deliverable_qty"] / 1e6).round(2)
-half_disp["net_value_crore"] = (half_disp["net_value"] / 1e7).round(2)
-half_disp = half_disp[
-    ["half_year", "symbol", "traded_qty_million", "deliverable_qty_million", "delivery_pct", "net_value_crore"]
-]
-styled_half = half_disp.style.applymap(highlight_net_value, subset=["net_value_crore"])
-st.dataframe(styled_half, use_container_width=True)
-
-half_chart = (
-    alt.Chart(half_yearly)
-    .mark_line(point=True)
-    .encode(
-        x=alt.X("half_year:T", title="Half-Year"),
-        y=alt.Y("delivery_pct:Q", title="Delivery %"),
-        color="symbol:N",
-        tooltip=["half_year:T", "symbol:N", "delivery_pct:Q"]
-    )
-    .properties(width=900, height=400, title="Half-Yearly Delivery %")
-)
-st.altair_chart(half_chart, use_container_width=True)
-
-# ------------------------------------------------------------------#
-# 13. Yearly Aggregation (Millions)
-# ------------------------------------------------------------------#
-st.markdown('<a name="yearly-delivery-table"></a>', unsafe_allow_html=True)
-st.subheader("📅 Yearly Delivery % (Quantities in Millions, Net Value in ₹ Crores)")
-
-df["year"] = df["date"].dt.to_period("Y").apply(lambda r: r.start_time)
-yearly = (
-    df.groupby(["year", "symbol"], as_index=False)[["traded_qty", "deliverable_qty", "net_value"]]
-    .sum()
-)
-yearly["delivery_pct"] = 100 * yearly["deliverable_qty"] / yearly["traded_qty"]
-
-year_disp = yearly.copy()
-year_disp["traded_qty_million"] = (year_disp["traded_qty"] / 1e6).round(2)
-year_disp["deliverable_qty_million"] = (year_disp["deliverable_qty"] / 1e6).round(2)
-year_disp["net_value_crore"] = (year_disp["net_value"] / 1e7).round(2)
-year_disp = year_disp[
-    ["year", "symbol", "traded_qty_million", "deliverable_qty_million", "delivery_pct", "net_value_crore"]
-]
-styled_year = year_disp.style.applymap(highlight_net_value, subset=["net_value_crore"])
-st.dataframe(styled_year, use_container_width=True)
-min_date = df["date"].min()
-max_date = df["date"].max()
-
-date_range = st.sidebar.date_input(
-    "📅 Select Date Range for Avg Delivery %",
-    value=(min_date, max_date),
-    min_value=min_date,
-    max_value=max_date,
-    key="avg_delivery_date_range"   # Unique key to avoid duplicate element ID error
-)
-
-
-if isinstance(date_range, tuple) and len(date_range) == 2:
-    start_date, end_date = date_range
-else:
-    start_date, end_date = min_date, max_date
-
-df_filtered = df[(df["date"] >= pd.to_datetime(start_date)) & (df["date"] <= pd.to_datetime(end_date))]
-avg_delivery_filtered = df_filtered["delivery_pct"].mean() if not df_filtered.empty else float('nan')
-
+"""
+delivery_dashboard.py
+~~~~~~~~~~~~~~~~~~~~~
+Interactive dashboard for Daily / Weekly / Monthly / Quarterly / Half-Yearly
+delivery percentage with optional Close‑price overlay.
+
+Author  : Yash Goyal
+Last Mod: 2025‑07‑21 (updated with date range avg delivery %)
+"""
+
+import csv
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.uploaded_file_manager import UploadedFile
+
+# ------------------------------------------------------------------#
+# 1. Page config
+# ------------------------------------------------------------------#
+st.set_page_config(page_title="Delivery % Dashboard", layout="wide")
+st.title("📊 Delivery Percentage Dashboard")
+
+# ------------------------------------------------------------------#
+# 📚 Table of Contents (Sidebar Links)
+# ------------------------------------------------------------------#
+st.sidebar.markdown("## 📚 Table of Contents")
+st.sidebar.markdown("[1. Summary Metrics](#summary-metrics)")
+st.sidebar.markdown("[2. Daily Delivery % Table](#daily-delivery-table)")
+st.sidebar.markdown("[3. Weekly Delivery % Table](#weekly-delivery-table)")
+st.sidebar.markdown("[4. Monthly Delivery % Table](#monthly-delivery-table)")
+st.sidebar.markdown("[5. Quarterly Delivery % Table](#quarterly-delivery-table)")
+st.sidebar.markdown("[6. Half-Yearly Delivery % Table](#half-yearly-delivery-table)")
+st.sidebar.markdown("[7. Yearly Delivery % Table](#yearly-delivery-table)")
+
+
+# ------------------------------------------------------------------#
+# 2. File upload (support multiple CSVs)
+# ------------------------------------------------------------------#
+uploaded_files = st.sidebar.file_uploader(
+    "📌 Upload one or more CSV files", type=["csv"], accept_multiple_files=True
+)
+if not uploaded_files:
+    st.info("Upload at least one CSV to begin.")
+    st.stop()
+
+# ------------------------------------------------------------------#
+# 3. Data loader & cleaner
+# ------------------------------------------------------------------#
+COL_MAP = {
+    "symbol": "symbol",
+    "date": "date",
+    "qty_traded": "traded_qty",
+    "total_traded_quantity": "traded_qty",
+    "traded_qty": "traded_qty",
+    "deliverable_qty": "deliverable_qty",
+    "delivered_qty": "deliverable_qty",
+    "delivery_percentage": "delivery_pct",
+    "delivery_percent": "delivery_pct",
+    "%_dly_qt_to_traded_qty": "delivery_pct",
+    "delivery_pct": "delivery_pct",
+    "open_price": "open",
+    "open": "open",
+    "closeprice": "close",
+    "close_price": "close",
+    "closing_price": "close",
+    "close": "close",
+}
+
+REQUIRED = ["symbol", "date", "traded_qty", "deliverable_qty", "delivery_pct"]
+
+
+@st.cache_data(
+    show_spinner=False,
+    persist="disk",
+    hash_funcs={UploadedFile: lambda f: hashlib.blake2b(f.getvalue()).digest()},
+)
+def load_and_clean(file: UploadedFile) -> pd.DataFrame:
+    file_bytes = file.getvalue()
+    # read the header alone first so only the columns the dashboard maps
+    # get parsed; bhavcopies carry a dozen extra fields that would
+    # otherwise be materialized, cleaned and cached for nothing
+    header_line = file_bytes.split(b"\n", 1)[0].decode("utf-8", errors="ignore")
+    header = next(csv.reader([header_line]))
+    wanted = [c for c in header if c.strip().lower().replace(" ", "_") in COL_MAP]
+
+    # sentinel strings become nulls at parse time, in C, instead of the
+    # full-frame df.replace scan that used to run afterwards (empty
+    # strings are already null under the default NA handling)
+    df = pd.read_csv(
+        BytesIO(file_bytes),
+        engine="pyarrow",
+        usecols=wanted,
+        na_values=["-", "NA", "N/A", "na"],
+    )
+    # normalize and map to canonical names in one pass over the header
+    df.columns = [
+        COL_MAP.get(norm, norm) for norm in
+        (c.strip().lower().replace(" ", "_") for c in df.columns)
+    ]
+
+    missing = [c for c in REQUIRED if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+    # bhavcopies use dd-Mon-yyyy; an explicit format takes pandas' C fast
+    # path (with unique-string caching) instead of per-value inference
+    dates = pd.to_datetime(df["date"], format="%d-%b-%Y", errors="coerce", cache=True)
+    if dates.isna().sum() > df["date"].isna().sum():
+        dates = pd.to_datetime(df["date"], errors="coerce", cache=True)
+    df["date"] = dates
+    df.dropna(subset=["date"], inplace=True)
+
+    numeric_cols = ["traded_qty", "deliverable_qty", "delivery_pct"]
+    if "open" in df.columns:
+        numeric_cols.append("open")
+    if "close" in df.columns:
+        numeric_cols.append("close")
+
+    # columns the parser already typed numeric (no "," or "%" in the file)
+    # skip the string pass entirely; the rest get one C-level translate
+    # scan before to_numeric coerces leftovers (incl. empty strings) to NaN
+    strip_map = {ord(","): None, ord("%"): None}
+    for c in numeric_cols:
+        # delivery_pct is rendered as-is (Styler formats at precision 6,
+        # which would expose float32 representation error), so it stays
+        # float64; the quantities are cast to uint32 right below anyway
+        downcast = None if c == "delivery_pct" else "float"
+        if df[c].dtype == object:
+            df[c] = pd.to_numeric(df[c].str.translate(strip_map), errors="coerce", downcast=downcast)
+        else:
+            df[c] = pd.to_numeric(df[c], errors="coerce", downcast=downcast)
+
+    df.dropna(subset=["traded_qty", "deliverable_qty", "delivery_pct"], inplace=True)
+    # bhavcopy quantities fit in uint32; symbol has few distinct values, so
+    # categorical codes make groupby/isin integer ops instead of string hashing
+    df["traded_qty"] = df["traded_qty"].astype("uint32")
+    df["deliverable_qty"] = df["deliverable_qty"].astype("uint32")
+    df["symbol"] = df["symbol"].astype("category")
+
+    # ✅ Calculate Net Value = Deliverable Qty × Open Price
+    df["net_value"] = pd.NA
+    if "open" in df.columns:
+        df["net_value"] = df["deliverable_qty"] * df["open"]
+
+    return df.reset_index(drop=True)
+
+# ------------------------------------------------------------------#
+# Cached period aggregation (weekly / monthly / quarterly / half-yearly / yearly)
+# ------------------------------------------------------------------#
+def half_year_start(dates: pd.Series) -> pd.Series:
+    """Vectorized half-year bucket: Jan 1 for Jan–Jun, Jul 1 for Jul–Dec."""
+    starts = pd.to_datetime(
+        {"year": dates.dt.year, "month": np.where(dates.dt.month <= 6, 1, 7), "day": 1}
+    )
+    return pd.Series(starts.to_numpy(), index=dates.index)
+
+
+@st.cache_data(
+    show_spinner=False,
+    hash_funcs={pd.DataFrame: lambda d: pd.util.hash_pandas_object(d, index=True).values.tobytes()},
+)
+def aggregate_periods(df: pd.DataFrame) -> dict:
+    """Build all period tables ("W", "M", "Q", "H", "Y") in one cached pass.
+
+    Only the weekly and monthly sums scan the raw rows; quarters, halves
+    and years nest inside months, so those are re-bucketed from the much
+    smaller monthly table instead of re-scanning the full frame.
+    """
+    qty_cols = ["traded_qty", "deliverable_qty", "net_value"]
+
+    def bucket_sum(frame, period):
+        out = (
+            frame.assign(period=period)
+            .groupby(["period", "symbol"], as_index=False, observed=True, sort=False)[qty_cols]
+            .sum()
+        )
+        out["delivery_pct"] = 100 * out["deliverable_qty"] / out["traded_qty"]
+        return out
+
+    # one stable sort feeds both full-frame aggregations: week and month
+    # ids are monotone within each symbol, so group boundaries are plain
+    # array diffs and np.add.reduceat sums the runs — no hashed groupby
+    # over the raw rows at all
+    base = df.sort_values(["symbol", "date"], kind="stable")
+    sym_codes = base["symbol"].cat.codes.to_numpy()
+    # float64 accumulators: NaN net_value rows count as 0 like pandas'
+    # skipna sum, and the wide dtype keeps 100 * qty arithmetic exact
+    # (the uint32 storage dtype would wrap in the derived delivery_pct)
+    values = np.nan_to_num(base[qty_cols].to_numpy(dtype="float64"), nan=0.0)
+
+    def boundary_sum(period_starts):
+        change = np.ones(len(sym_codes), dtype=bool)
+        if len(change) > 1:
+            change[1:] = (sym_codes[1:] != sym_codes[:-1]) | (
+                period_starts[1:] != period_starts[:-1]
+            )
+        starts = np.flatnonzero(change)
+        out = pd.DataFrame(np.add.reduceat(values, starts, axis=0), columns=qty_cols)
+        out.insert(0, "symbol", pd.Categorical.from_codes(sym_codes[starts], dtype=base["symbol"].dtype))
+        out.insert(0, "period", period_starts[starts])
+        out["delivery_pct"] = 100 * out["deliverable_qty"] / out["traded_qty"]
+        return out
+
+    weekly = boundary_sum(base["date"].dt.to_period("W").dt.start_time.to_numpy())
+    monthly = boundary_sum(base["date"].dt.to_period("M").dt.start_time.to_numpy())
+    quarterly = bucket_sum(monthly, monthly["period"].dt.to_period("Q").dt.start_time)
+    half_yearly = bucket_sum(monthly, half_year_start(monthly["period"]))
+    yearly = bucket_sum(monthly, monthly["period"].dt.to_period("Y").dt.start_time)
+
+    # groupby runs with sort=False; order the small result frames here
+    # instead of paying for an implicit sort inside the full-frame groupby
+    for out in (quarterly, half_yearly, yearly):
+        out.sort_values(["period", "symbol"], inplace=True, ignore_index=True)
+
+    # weekly/monthly need no sort at all: boundary_sum walks the
+    # (symbol, date)-sorted base in order, so its rows already come out
+    # grouped by symbol with periods ascending
+    for out in (weekly, monthly):
+        add_pct_change_cols(out)
+
+    return {"W": weekly, "M": monthly, "Q": quarterly, "H": half_yearly, "Y": yearly}
+
+
+@st.cache_data(
+    show_spinner=False,
+    hash_funcs={pd.DataFrame: lambda d: pd.util.hash_pandas_object(d, index=True).values.tobytes()},
+)
+def delivery_pct_order(df: pd.DataFrame) -> tuple:
+    """Row order of df by ascending delivery %, plus the reordered values.
+
+    Cached so a slider tick costs one binary search over the sorted values
+    instead of a boolean scan of the full frame per rerun.
+    """
+    pct = df["delivery_pct"].to_numpy()
+    order = np.argsort(pct, kind="stable")
+    return order, pct[order]
+
+
+def add_pct_change_cols(frame: pd.DataFrame) -> None:
+    """Append traded/deliverable %-change columns to a symbol-sorted frame.
+
+    Rows are grouped by symbol, so the change is one shifted-ratio over the
+    raw numpy buffer; the first row of each symbol, where the shift crosses
+    group boundaries, is blanked to NaN.
+    """
+    first_row = frame["symbol"].ne(frame["symbol"].shift()).to_numpy()
+    for col in ("traded_qty", "deliverable_qty"):
+        vals = frame[col].to_numpy(dtype="float64")
+        chg = np.full(len(vals), np.nan)
+        if len(vals) > 1:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                chg[1:] = (vals[1:] / vals[:-1] - 1.0) * 100
+        chg[first_row] = np.nan
+        frame[f"{col}_chg_%"] = chg
+
+
+def to_display_units(col: pd.Series, divisor: float) -> np.ndarray:
+    """Convert a quantity column to display units (millions/crores) in one
+    float64 buffer: the cast copies once, then divide and round reuse it.
+    float64, not float32 — the Styler formats at precision 6, which would
+    expose float32 representation error in the rounded values."""
+    arr = col.to_numpy(dtype="float64", copy=True)
+    np.divide(arr, divisor, out=arr)
+    return np.round(arr, 2, out=arr)
+
+
+def display_table(frame: pd.DataFrame, period_col: str) -> pd.DataFrame:
+    """Millions/crores display view of a period table, built by selecting
+    just the shown columns instead of copying the whole aggregate."""
+    disp = frame[[period_col, "symbol", "delivery_pct"]].assign(
+        traded_qty_million=to_display_units(frame["traded_qty"], 1e6),
+        deliverable_qty_million=to_display_units(frame["deliverable_qty"], 1e6),
+        net_value_crore=to_display_units(frame["net_value"], 1e7),
+    )
+    cols = [period_col, "symbol", "traded_qty_million", "deliverable_qty_million",
+            "delivery_pct", "net_value_crore"]
+    if "traded_qty_chg_%" in frame.columns:
+        disp["traded_qty_chg_%"] = frame["traded_qty_chg_%"].round(2)
+        disp["deliverable_qty_chg_%"] = frame["deliverable_qty_chg_%"].round(2)
+        cols += ["traded_qty_chg_%", "deliverable_qty_chg_%"]
+    return disp[cols]
+
+
+def line_spec(time_field: str, title: str, x_title: str = None, y_title: str = None) -> dict:
+    """Vega-Lite spec for the delivery % line charts, built as a plain dict
+    so reruns skip Altair's Python-side schema validation."""
+    x = {"field": time_field, "type": "temporal"}
+    y = {"field": "delivery_pct", "type": "quantitative"}
+    if x_title:
+        x["title"] = x_title
+    if y_title:
+        y["title"] = y_title
+    return {
+        "mark": {"type": "line", "point": True},
+        "encoding": {
+            "x": x,
+            "y": y,
+            "color": {"field": "symbol", "type": "nominal"},
+            "tooltip": [
+                {"field": time_field, "type": "temporal"},
+                {"field": "symbol", "type": "nominal"},
+                {"field": "delivery_pct", "type": "quantitative"},
+            ],
+        },
+        "height": 400,
+        "title": title,
+    }
+
+# ------------------------------------------------------------------#
+# 4. Load, clean and merge multiple files
+# ------------------------------------------------------------------#
+# parse uploads in parallel — read_csv releases the GIL during the parse,
+# so multi-file uploads scale across cores; one file skips the pool
+if len(uploaded_files) > 1:
+    with ThreadPoolExecutor(max_workers=min(8, len(uploaded_files))) as pool:
+        dfs = list(pool.map(load_and_clean, uploaded_files))
+else:
+    dfs = [load_and_clean(uploaded_files[0])]
+
+df = pd.concat(dfs, ignore_index=True)
+# concat falls back to object dtype when files carry different symbol sets
+df["symbol"] = df["symbol"].astype("category")
+
+# dedup on a packed int64 key (trading day, symbol code) — one integer
+# hash pass instead of hashing (str, Timestamp) tuples per row; day
+# resolution keeps the shift well inside int64 range
+day = df["date"].to_numpy().astype("datetime64[D]").astype("int64")
+key = (day << 16) | df["symbol"].cat.codes.to_numpy().astype("int64")
+df = (
+    df.loc[~pd.Series(key).duplicated().to_numpy()]
+    .sort_values("date")
+    .reset_index(drop=True)
+)
+
+# ------------------------------------------------------------------#
+# New: Date range selector for filtered average delivery %
+# ------------------------------------------------------------------#
+min_date = df["date"].min()
+max_date = df["date"].max()
+
+date_range = st.sidebar.date_input(
+    "📅 Select Date Range for Avg Delivery %",
+    value=(min_date, max_date),
+    min_value=min_date,
+    max_value=max_date,
+)
+
+if isinstance(date_range, tuple) and len(date_range) == 2:
+    start_date, end_date = date_range
+else:
+    start_date, end_date = min_date, max_date
+
+# ------------------------------------------------------------------#
+# 5. Sidebar filters
+# ------------------------------------------------------------------#
+spike_thr = st.sidebar.slider("🚨 Spike threshold (%)", 0.0, 100.0, 75.0, step=0.5)
+net_value_thr = st.sidebar.slider("💰 Net Value Spike (₹ Cr)", 0.0, 50.0, 3.0, step=0.5)
+
+show_all_daily = st.sidebar.checkbox("🧾 Show all daily rows", value=False)
+
+symbols = df["symbol"].cat.categories.tolist()
+selected_symbols = st.sidebar.multiselect("🔎 Symbols", symbols, default=symbols)
+if selected_symbols:
+    # match on integer category codes instead of hashing strings per row
+    keep = pd.Categorical(selected_symbols, categories=df["symbol"].cat.categories).codes
+    df = df.loc[df["symbol"].cat.codes.isin(keep)].reset_index(drop=True)
+
+# computed after the symbol filter so the date-range average covers the
+# same population as the overall average next to it
+df_filtered = df[(df["date"] >= pd.to_datetime(start_date)) & (df["date"] <= pd.to_datetime(end_date))]
+avg_delivery_filtered = df_filtered["delivery_pct"].mean() if not df_filtered.empty else float('nan')
+
+# ------------------------------------------------------------------#
+# 6. Summary metrics
+# ------------------------------------------------------------------#
+st.markdown('<a name="summary-metrics"></a>', unsafe_allow_html=True)
+st.subheader("📌 Summary Metrics")
+col1, col2, col3, col4 = st.columns(4)
+
+col1.metric("Average Delivery % (Overall)", f"{df['delivery_pct'].mean():.2f}")
+col2.metric(
+    f"Average Delivery % ({start_date} to {end_date})",
+    f"{avg_delivery_filtered:.2f}" if not pd.isna(avg_delivery_filtered) else "N/A"
+)
+col3.metric("Max Delivery %", f"{df['delivery_pct'].max():.2f}")
+col4.metric("Total Days", int(df["date"].nunique()))
+
+# ------------------------------------------------------------------#
+# 7. Spike alerts
+# ------------------------------------------------------------------#
+# binary search over the cached sorted order instead of re-scanning the
+# frame each slider tick; np.sort on the matched positions restores the
+# table's original date order
+order, sorted_pct = delivery_pct_order(df)
+first = np.searchsorted(sorted_pct, spike_thr, side="left")
+spikes = df.iloc[np.sort(order[first:])]
+if not spikes.empty:
+    st.warning(f"🚨 {len(spikes)} spike(s) ≥ {spike_thr}%")
+    st.dataframe(spikes[["date", "symbol", "delivery_pct"]])
+
+# ------------------------------------------------------------------#
+# 8. Daily Delivery % Table
+# ------------------------------------------------------------------#
+st.markdown('<a name="daily-delivery-table"></a>', unsafe_allow_html=True)
+st.subheader("📆 Daily Delivery % (Quantities in Millions, Net Value in ₹ Crores)")
+
+df = df.sort_values(["symbol", "date"])
+add_pct_change_cols(df)
+
+daily_disp = df[["date", "symbol", "delivery_pct"]].assign(
+    traded_qty_mn=to_display_units(df["traded_qty"], 1e6),
+    deliverable_qty_mn=to_display_units(df["deliverable_qty"], 1e6),
+    net_value_crore=to_display_units(df["net_value"], 1e7),
+    **{
+        "traded_qty_chg_%": df["traded_qty_chg_%"].round(2),
+        "deliverable_qty_chg_%": df["deliverable_qty_chg_%"].round(2),
+    },
+)
+
+daily_columns = [
+    "date",
+    "symbol",
+    "traded_qty_mn",
+    "deliverable_qty_mn",
+    "delivery_pct",
+    "net_value_crore",
+    "traded_qty_chg_%",
+    "deliverable_qty_chg_%",
+]
+
+def highlight_net_value(col):
+    # column-wise: one vectorized comparison instead of a Python call per cell
+    return np.where(col > net_value_thr, "background-color: #ffe6e6; font-weight: bold", "")
+
+# Styler serializes per-cell HTML, so rendering every daily row scales with
+# the full history; cap the default view and keep the complete table behind
+# the sidebar toggle / CSV download instead
+DAILY_ROW_LIMIT = 500
+daily_view = daily_disp[daily_columns]
+if not show_all_daily and len(daily_view) > DAILY_ROW_LIMIT:
+    st.caption(
+        f"Showing the {DAILY_ROW_LIMIT} most recent of {len(daily_view)} rows — "
+        "tick '🧾 Show all daily rows' in the sidebar for the full table."
+    )
+    # the frame is ordered (symbol, date), so a plain tail would keep only
+    # the last symbols; pick the most recent dates across all symbols and
+    # re-sort the positions to preserve the display order
+    recent = np.argsort(daily_view["date"].to_numpy(), kind="stable")[-DAILY_ROW_LIMIT:]
+    daily_view = daily_view.iloc[np.sort(recent)]
+
+styled_df = daily_view.style.apply(
+    highlight_net_value, subset=["net_value_crore"]
+)
+
+st.dataframe(styled_df, use_container_width=True)
+st.download_button(
+    "⬇️ Download full daily table (CSV)",
+    daily_disp[daily_columns].to_csv(index=False).encode(),
+    file_name="daily_delivery_pct.csv",
+    mime="text/csv",
+)
+
+# ------------------------------------------------------------------#
+# 9. Weekly Aggregation
+# ------------------------------------------------------------------#
+st.markdown('<a name="weekly-delivery-table"></a>', unsafe_allow_html=True)
+st.subheader("📅 Weekly Delivery % (Quantities in Millions, Net Value in ₹ Crores)")
+
+period_tables = aggregate_periods(df)
+
+weekly = period_tables["W"].rename(columns={"period": "week"})
+
+styled_weekly = display_table(weekly, "week").style.apply(highlight_net_value, subset=["net_value_crore"])
+st.dataframe(styled_weekly, use_container_width=True)
+
+st.vega_lite_chart(
+    weekly[["week", "symbol", "delivery_pct"]],
+    line_spec("week", "Weekly Delivery %"),
+    use_container_width=True,
+)
+
+
+# ------------------------------------------------------------------#
+# 10. Monthly Aggregation (Millions)
+# ------------------------------------------------------------------#
+
+st.markdown('<a name="monthly-delivery-table"></a>', unsafe_allow_html=True)
+st.subheader("📅 Monthly Delivery % (Quantities in Millions, Net Value in ₹ Crores)")
+
+
+monthly = period_tables["M"].rename(columns={"period": "month"})
+
+styled_monthly = display_table(monthly, "month").style.apply(highlight_net_value, subset=["net_value_crore"])
+st.dataframe(styled_monthly, use_container_width=True)
+
+st.vega_lite_chart(
+    monthly[["month", "symbol", "delivery_pct"]],
+    line_spec("month", "Monthly Delivery %"),
+    use_container_width=True,
+)
+
+# ------------------------------------------------------------------#
+# 11. Quarterly Aggregation (Millions)
+# ------------------------------------------------------------------#
+st.markdown('<a name="quarterly-delivery-table"></a>', unsafe_allow_html=True)
+st.subheader("📊 Quarterly Delivery % (Quantities in Millions, Net Value in ₹ Crores)")
+
+quarterly = period_tables["Q"].rename(columns={"period": "quarter"})
+
+styled_quarterly = display_table(quarterly, "quarter").style.apply(highlight_net_value, subset=["net_value_crore"])
+st.dataframe(styled_quarterly, use_container_width=True)
+
+st.vega_lite_chart(
+    quarterly[["quarter", "symbol", "delivery_pct"]],
+    line_spec("quarter", "Quarterly Delivery %"),
+    use_container_width=True,
+)
+
+# ------------------------------------------------------------------#
+# 12. Half-Yearly Aggregation (Millions)
+# ------------------------------------------------------------------#
+st.markdown('<a name="half-yearly-delivery-table"></a>', unsafe_allow_html=True)
+st.subheader("📈 Half-Yearly Delivery % (Quantities in Millions, Net Value in ₹ Crores)")
+
+half_yearly = period_tables["H"].rename(columns={"period": "half_year"})
+
+styled_half = display_table(half_yearly, "half_year").style.apply(highlight_net_value, subset=["net_value_crore"])
+st.dataframe(styled_half, use_container_width=True)
+
+st.vega_lite_chart(
+    half_yearly[["half_year", "symbol", "delivery_pct"]],
+    line_spec("half_year", "Half-Yearly Delivery %", x_title="Half-Year", y_title="Delivery %"),
+    use_container_width=True,
+)
+
+# ------------------------------------------------------------------#
+# 13. Yearly Aggregation (Millions)
+# ------------------------------------------------------------------#
+st.markdown('<a name="yearly-delivery-table"></a>', unsafe_allow_html=True)
+st.subheader("📅 Yearly Delivery % (Quantities in Millions, Net Value in ₹ Crores)")
+
+yearly = period_tables["Y"].rename(columns={"period": "year"})
+
+styled_year = display_table(yearly, "year").style.apply(highlight_net_value, subset=["net_value_crore"])
+st.dataframe(styled_year, use_container_width=True)
+min_date = df["date"].min()
+max_date = df["date"].max()
+
+date_range = st.sidebar.date_input(
+    "📅 Select Date Range for Avg Delivery %",
+    value=(min_date, max_date),
+    min_value=min_date,
+    max_value=max_date,
+    key="avg_delivery_date_range"   # Unique key to avoid duplicate element ID error
+)
+
+
+if isinstance(date_range, tuple) and len(date_range) == 2:
+    start_date, end_date = date_range
+else:
+    start_date, end_date = min_date, max_date
+
+df_filtered = df[(df["date"] >= pd.to_datetime(start_date)) & (df["date"] <= pd.to_datetime(end_date))]
+avg_delivery_filtered = df_filtered["delivery_pct"].mean() if not df_filtered.empty else float('nan')
+